@@ -1,8 +1,10 @@
+import random
 import sys
 import unittest
 
 from hypothesis import given, settings, strategies
 
+import ujsondiff
 from tests.utils import generate_random_json, perturbate_json
 from ujsondiff import JsonDiffer, add, delete, diff, discard, insert, replace
 
@@ -84,6 +86,41 @@ class JsonDiffTests(unittest.TestCase):
 
         self.assertEqual(d, differ.unmarshal(dm))
 
+    def _primitive_scenarios(self):
+        rng = random.Random(20260901)
+        alphabet = ["a", "b", "c", 1, 2, 2.5, None, True]
+        for _ in range(50):
+            a = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+            b = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+            yield a, b
+
+    def _diff_forcing(self, a, b, **overrides):
+        saved = {k: getattr(ujsondiff, k) for k in overrides}
+        try:
+            for k, v in overrides.items():
+                setattr(ujsondiff, k, v)
+            differ = JsonDiffer()
+            return differ.diff(a, b), differ.similarity(a, b)
+        finally:
+            for k, v in saved.items():
+                setattr(ujsondiff, k, v)
+
+    def _check_kernel(self, **overrides):
+        differ = JsonDiffer()
+        for a, b in self._primitive_scenarios():
+            # plain DP reference: disable the primitive fast paths
+            expected = self._diff_forcing(a, b, _primitive_types=())
+            actual = self._diff_forcing(a, b, **overrides)
+            self.assertEqual(expected, actual)
+            self.assertEqual(b, differ.patch(a, actual[0]))
+
+    def test_bit_parallel_lcs_matches_plain_dp(self):
+        self._check_kernel(_lcs_fill=None)
+
+    @unittest.skipIf(ujsondiff._lcs_fill is None, "numba/numpy not installed")
+    def test_compiled_lcs_matches_plain_dp(self):
+        self._check_kernel(_bp_min_cells=1 << 30)
+
     @given(strategies.randoms().map(generate_scenario_no_sets))
     @settings(max_examples=1000)
     def test_dump(self, scenario):
@@ -100,6 +137,43 @@ class JsonDiffTests(unittest.TestCase):
         dm = differ.marshal(d)
         self.assertEqual(d, differ.unmarshal(dm))
 
+    def test_patch_inplace(self):
+        differ = JsonDiffer()
+        a = {"a": [1, 2, {"b": 3}], "c": 4, "e": {1, 2}}
+        b = {"a": [1, {"b": 5}], "c": 4, "e": {1, 3}, "d": 6}
+        d = differ.diff(a, b)
+
+        expected = differ.patch(a, d)
+        self.assertEqual(b, expected)
+        # default keeps the input untouched
+        self.assertEqual({"a": [1, 2, {"b": 3}], "c": 4, "e": {1, 2}}, a)
+
+        patched = differ.patch(a, d, inplace=True)
+        self.assertIs(a, patched)
+        self.assertEqual(expected, patched)
+
+    def test_hirschberg_path(self):
+        differ = JsonDiffer()
+        rng = random.Random(20260831)
+        saved = ujsondiff._hirschberg_min_cells
+        try:
+            for _ in range(100):
+                a = [
+                    generate_random_json(rng, max_depth=2)
+                    for _ in range(rng.randint(2, 12))
+                ]
+                b = perturbate_json(a, rng)
+                ujsondiff._hirschberg_min_cells = saved
+                s_plain = differ.similarity(a, b)
+                ujsondiff._hirschberg_min_cells = 0
+                d = differ.diff(a, b)
+                self.assertEqual(b, differ.patch(a, d))
+                # same optimal score; ties break toward matched pairs,
+                # so similarity never drops below the matrix path
+                self.assertGreaterEqual(differ.similarity(a, b) + 1e-9, s_plain)
+        finally:
+            ujsondiff._hirschberg_min_cells = saved
+
     def test_long_arrays(self):
         size = 100
         a = [{"a": i, "b": 2 * i} for i in range(1, size)]
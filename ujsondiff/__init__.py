@@ -1,6 +1,30 @@
 __version__ = "3.0.0"
 
+import functools
 import json
+from operator import itemgetter
+
+try:
+    import orjson as _orjson
+
+    _fast_loads = _orjson.loads
+except ImportError:
+    try:
+        import ujson as _ujson
+
+        _fast_loads = _ujson.loads
+    except ImportError:
+        _fast_loads = None
+
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+try:
+    import numba as _numba
+except ImportError:
+    _numba = None
 
 from ujsondiff.symbols import (
     Symbol,
@@ -13,6 +37,56 @@ from ujsondiff.symbols import (
     replace,
 )
 
+if _np is not None and _numba is not None:
+
+    @_numba.njit(cache=True)
+    def _lcs_fill(eq, C):
+        m, n = eq.shape
+        for i in range(1, m + 1):
+            for j in range(1, n + 1):
+                C[i, j] = max(
+                    C[i, j - 1], C[i - 1, j], C[i - 1, j - 1] + eq[i - 1, j - 1]
+                )
+
+else:
+    _lcs_fill = None
+
+_primitive_types = (str, int, float, type(None))
+_leaf_types = frozenset((str, int, float, bool, type(None)))
+
+
+def _all_primitive(values):
+    return all(isinstance(v, _primitive_types) for v in values)
+
+
+def _equality_matrix(xi, yi):
+    # one vectorized outer product instead of m*n Python comparisons
+    xs = _np.asarray(xi, dtype=_np.int64)
+    ys = _np.asarray(yi, dtype=_np.int64)
+    return _np.equal.outer(xs, ys).astype(_np.int8)
+
+
+def _rank_compress(X, Y):
+    # dense-rank the combined values so the LCS kernels compare small
+    # ints instead of arbitrary objects
+    ids = {}
+    xi = [ids.setdefault(x, len(ids)) for x in X]
+    yi = [ids.setdefault(y, len(ids)) for y in Y]
+    return xi, yi
+
+
+@functools.lru_cache(maxsize=8)
+def _make_symbol_map(escape_str):
+    return {escape_str + symbol.label: symbol for symbol in _all_symbols_}
+
+
+# below this many LCS cells the compiled kernel beats the big-int path
+_bp_min_cells = 1 << 14
+
+# above this many LCS cells, trade the O(mn) score/diff tables for
+# Hirschberg's O(m+n) space divide-and-conquer
+_hirschberg_min_cells = 1 << 20
+
 
 class JsonDumper:
     def __init__(self, **kwargs):
@@ -34,6 +108,12 @@ class JsonLoader:
 
     def __call__(self, src):
         if isinstance(src, str):
+            if not self.kwargs and _fast_loads is not None:
+                try:
+                    return _fast_loads(src)
+                except ValueError:
+                    # stdlib accepts more than orjson (NaN/Infinity, ...)
+                    pass
             return json.loads(src, **self.kwargs)
         else:
             return json.load(src, **self.kwargs)
@@ -64,7 +144,7 @@ class CompactJsonDiffSyntax:
             if inserted:
                 d[insert] = inserted
             if deleted:
-                d[delete] = [pos for pos, value in deleted]
+                d[delete] = list(map(itemgetter(0), deleted))
             return d
 
     def emit_dict_diff(self, a, b, s, added, changed, removed):
@@ -84,14 +164,17 @@ class CompactJsonDiffSyntax:
         else:
             return {replace: b} if isinstance(b, dict) else b
 
-    def patch(self, a, d):
+    def patch(self, a, d, inplace=False):
+        # with inplace=True the caller hands over ownership of a, which
+        # is mutated and must not be reused afterwards
         if isinstance(d, dict):
             if not d:
                 return a
             if replace in d:
                 return d[replace]
             if isinstance(a, dict):
-                a = dict(a)
+                if not inplace:
+                    a = dict(a)
                 for k, v in d.items():
                     if k == delete:
                         for kdel in v:
@@ -101,11 +184,12 @@ class CompactJsonDiffSyntax:
                         if av == missing:
                             a[k] = v
                         else:
-                            a[k] = self.patch(av, v)
+                            a[k] = self.patch(av, v, inplace)
                 return a
             elif isinstance(a, (list, tuple)):
                 original_type = type(a)
-                a = list(a)
+                if not inplace or original_type is not list:
+                    a = list(a)
                 if delete in d:
                     for pos in d[delete]:
                         a.pop(pos)
@@ -115,12 +199,13 @@ class CompactJsonDiffSyntax:
                 for k, v in d.items():
                     if k != delete and k != insert:
                         k = int(k)
-                        a[k] = self.patch(a[k], v)
+                        a[k] = self.patch(a[k], v, inplace)
                 if original_type is not list:
                     a = original_type(a)
                 return a
             elif isinstance(a, set):
-                a = set(a)
+                if not inplace:
+                    a = set(a)
                 if discard in d:
                     for x in d[discard]:
                         a.discard(x)
@@ -156,52 +241,199 @@ class JsonDiffer:
         self.options.loader = loader
         self.options.dumper = dumper
         self.options.escape_str = escape_str
-        self._symbol_map = {
-            escape_str + symbol.label: symbol for symbol in _all_symbols_
+        self._symbol_map = _make_symbol_map(escape_str)
+        self._unescape_cache = {}
+        self._dispatch = {
+            (dict, dict): self._dict_diff,
+            (list, list): self._list_diff,
+            (tuple, tuple): self._list_diff,
+            (set, set): self._set_diff,
         }
 
-    def _list_diff_0(self, C, X, Y):
+    def _list_diff_0(self, C, X, Y, S):
         i, j = len(X), len(Y)
         r = []
+        append = r.append
         while True:
+            Ci = C[i]
+            Ci1 = C[i - 1] if i > 0 else None
             if i > 0 and j > 0:
-                d, s = self._obj_diff(X[i - 1], Y[j - 1])
-                if s > 0 and C[i][j] == C[i - 1][j - 1] + s:
-                    r.append((0, d, j - 1, s))
-                    i, j = i - 1, j - 1
+                i1, j1 = i - 1, j - 1
+                s = S[i1][j1]
+                if s > 0 and Ci[j] == Ci1[j1] + s:
+                    # only changed pairs need their diff; re-deriving it
+                    # here costs O(m+n) calls instead of an O(mn) table
+                    d = self._obj_diff(X[i1], Y[j1])[0] if s < 1 else None
+                    append((0, d, j1, s))
+                    i, j = i1, j1
                     continue
-            if j > 0 and (i == 0 or C[i][j - 1] >= C[i - 1][j]):
+            if j > 0 and (i == 0 or Ci[j - 1] >= Ci1[j]):
+                append((1, Y[j - 1], j - 1, 0.0))
+                j -= 1
+                continue
+            if i > 0 and (j == 0 or Ci[j - 1] < Ci1[j]):
+                append((-1, X[i - 1], i - 1, 0.0))
+                i -= 1
+                continue
+            r.reverse()
+            return r
+
+    def _bp_list_diff_0(self, X, Y):
+        xs, ys = _rank_compress(X, Y)
+        m = len(xs)
+        full = (1 << m) - 1
+        B = {}
+        for k, c in enumerate(xs):
+            B[c] = B.get(c, 0) | (1 << k)
+        # Hyyro's bit-parallel LCS: bit i of cols[j] is 0 iff the DP
+        # column j gains a match between rows i and i+1
+        V = full
+        cols = [V]
+        for c in ys:
+            b = B.get(c, 0)
+            V = ((V + (V & b)) | (V & ~b)) & full
+            cols.append(V)
+
+        def lcs_len(i, j):
+            return i - bin(cols[j] & ((1 << i) - 1)).count("1")
+
+        i, j = m, len(ys)
+        r = []
+        while True:
+            if i > 0 and j > 0 and xs[i - 1] == ys[j - 1]:
+                r.append((0, None, j - 1, 1.0))
+                i, j = i - 1, j - 1
+                continue
+            if j > 0 and (i == 0 or lcs_len(i, j - 1) >= lcs_len(i - 1, j)):
                 r.append((1, Y[j - 1], j - 1, 0.0))
                 j = j - 1
                 continue
-            if i > 0 and (j == 0 or C[i][j - 1] < C[i - 1][j]):
+            if i > 0 and (j == 0 or lcs_len(i, j - 1) < lcs_len(i - 1, j)):
                 r.append((-1, X[i - 1], i - 1, 0.0))
                 i = i - 1
                 continue
             return reversed(r)
 
-    def _list_diff(self, X, Y):
+    def _lcs_primitive(self, X, Y):
+        xi, yi = _rank_compress(X, Y)
+        eq = _equality_matrix(xi, yi)
+        C = _np.zeros((len(X) + 1, len(Y) + 1), dtype=_np.int32)
+        _lcs_fill(eq, C)
+        return C, eq
+
+    def _list_diff_ops(self, X, Y):
         m = len(X)
         n = len(Y)
-        C = [[0 for j in range(n + 1)] for i in range(m + 1)]
+        # plain lists here: the fill is an interpreted loop, and reading
+        # ndarray cells from Python boxes a float per access
+        C = [[0.0] * (n + 1) for i in range(m + 1)]
+        S = [[0.0] * n for _ in range(m)]
         for i in range(1, m + 1):
             for j in range(1, n + 1):
                 _, s = self._obj_diff(X[i - 1], Y[j - 1])
+                S[i - 1][j - 1] = s
                 C[i][j] = max(C[i][j - 1], C[i - 1][j], C[i - 1][j - 1] + s)
+        return self._list_diff_0(C, X, Y, S)
+
+    def _nw_score(self, X, Y):
+        # last row of the LCS score matrix in O(n) space; each cell is
+        # (score, matches) so ties break toward alignments that keep
+        # pairs matched, like the full-matrix traceback does
+        n = len(Y)
+        prev = [(0.0, 0)] * (n + 1)
+        for x in X:
+            cur = [(0.0, 0)] * (n + 1)
+            for j in range(1, n + 1):
+                _, s = self._obj_diff(x, Y[j - 1])
+                ps, pm = prev[j - 1]
+                best = (ps + s, pm + 1) if s > 0 else prev[j - 1]
+                if prev[j] > best:
+                    best = prev[j]
+                if cur[j - 1] > best:
+                    best = cur[j - 1]
+                cur[j] = best
+            prev = cur
+        return prev
+
+    def _hirschberg_ops(self, X, Y, x0, y0, out):
+        # the alignment score always equals the full-matrix optimum, but
+        # among equally-scored alignments this prefers the one with the
+        # most matched pairs, so similarity can come out slightly higher
+        # than the matrix traceback's pick (never lower)
+        m, n = len(X), len(Y)
+        if m == 0:
+            for j in range(n):
+                out.append((1, Y[j], y0 + j, 0.0))
+            return
+        if n == 0:
+            for i in range(m):
+                out.append((-1, X[i], x0 + i, 0.0))
+            return
+        if m == 1 or n == 1:
+            for sign, value, pos, s in self._list_diff_ops(X, Y):
+                if sign == -1:
+                    out.append((sign, value, x0 + pos, s))
+                else:
+                    out.append((sign, value, y0 + pos, s))
+            return
+        mid = m // 2
+        left = self._nw_score(X[:mid], Y)
+        right = self._nw_score(X[mid:][::-1], Y[::-1])
+        k = max(
+            range(n + 1),
+            key=lambda j: (
+                left[j][0] + right[n - j][0],
+                left[j][1] + right[n - j][1],
+            ),
+        )
+        self._hirschberg_ops(X[:mid], Y[:k], x0, y0, out)
+        self._hirschberg_ops(X[mid:], Y[k:], x0 + mid, y0 + k, out)
+
+    def _list_diff(self, X, Y):
+        m = len(X)
+        n = len(Y)
+        # identical leading/trailing runs always align with score 1, so
+        # strip them and run the DP on the diverging middle only
+        p = 0
+        mn = min(m, n)
+        while p < mn and X[p] == Y[p]:
+            p += 1
+        q = 0
+        while q < mn - p and X[m - 1 - q] == Y[n - 1 - q]:
+            q += 1
+        if p or q:
+            Xc = X[p : m - q]
+            Yc = Y[p : n - q]
+        else:
+            Xc, Yc = X, Y
+        mc = len(Xc)
+        nc = len(Yc)
+        if mc > 0 and nc > 0 and _all_primitive(Xc) and _all_primitive(Yc):
+            if _lcs_fill is not None and mc * nc <= _bp_min_cells:
+                C, S = self._lcs_primitive(Xc, Yc)
+                ops = self._list_diff_0(C, Xc, Yc, S)
+            else:
+                ops = self._bp_list_diff_0(Xc, Yc)
+        elif mc * nc > _hirschberg_min_cells:
+            ops = []
+            self._hirschberg_ops(Xc, Yc, 0, 0, ops)
+        else:
+            ops = self._list_diff_ops(Xc, Yc)
         inserted = []
         deleted = []
         changed = {}
-        tot_s = 0.0
+        tot_s = float(p + q)
 
-        for sign, value, pos, s in self._list_diff_0(C, X, Y):
+        for sign, value, pos, s in ops:
             if sign == 1:
-                inserted.append((pos, value))
+                inserted.append((pos + p, value))
             elif sign == -1:
-                deleted.insert(0, (pos, value))
+                deleted.append((pos + p, value))
             elif sign == 0 and s < 1:
-                changed[pos] = value
+                changed[pos + p] = value
             tot_s += s
-        tot_n = len(X) + len(inserted)
+        deleted.reverse()
+        tot_n = m + len(inserted)
         if tot_n == 0:
             s = 1.0
         else:
@@ -216,67 +448,63 @@ class JsonDiffer:
         added = b.difference(a)
         if not removed and not added:
             return {}, 1.0
-        ranking = sorted(
-            ((self._obj_diff(x, y)[1], x, y) for x in removed for y in added),
-            reverse=True,
-            key=lambda x: x[0],
-        )
-        r2 = set(removed)
-        a2 = set(added)
         n_common = len(a) - len(removed)
         s_common = float(n_common)
-        for s, x, y in ranking:
-            if x in r2 and y in a2:
-                r2.discard(x)
-                a2.discard(y)
-                s_common += s
-                n_common += 1
-            if not r2 or not a2:
-                break
+        # cross pairs of primitives always score 0, so the greedy pairing
+        # can only raise s_common when container elements are involved
+        has_containers = not (_all_primitive(removed) and _all_primitive(added))
+        if removed and added and has_containers:
+            ranking = sorted(
+                ((self._obj_diff(x, y)[1], x, y) for x in removed for y in added),
+                reverse=True,
+                key=lambda x: x[0],
+            )
+            r2 = set(removed)
+            a2 = set(added)
+            for s, x, y in ranking:
+                if x in r2 and y in a2:
+                    r2.discard(x)
+                    a2.discard(y)
+                    s_common += s
+                    n_common += 1
+                if not r2 or not a2:
+                    break
         n_tot = len(a) + len(added)
         s = s_common / n_tot if n_tot != 0 else 1.0
         return self.options.syntax.emit_set_diff(a, b, s, added, removed), s
 
     def _dict_diff(self, a, b):
+        # iterate a/b in insertion order so emitted diffs are stable
+        # across processes; the key views only serve membership tests
+        ak = a.keys()
+        bk = b.keys()
         removed = {}
-        nremoved = 0
-        nadded = 0
-        nmatched = 0
-        smatched = 0.0
-        added = {}
         changed = {}
+        smatched = 0.0
         for k, v in a.items():
-            w = b.get(k, missing)
-            if isinstance(w, Symbol):
-                if w == missing:
-                    nremoved += 1
-                    removed[k] = v
+            if k not in bk:
+                removed[k] = v
             else:
-                nmatched += 1
-                d, s = self._obj_diff(v, w)
+                d, s = self._obj_diff(v, b[k])
                 if s < 1.0:
                     changed[k] = d
                 smatched += 0.5 + 0.5 * s
-        for k, v in b.items():
-            if k not in a:
-                nadded += 1
-                added[k] = v
-        n_tot = nremoved + nmatched + nadded
+        added = {k: v for k, v in b.items() if k not in ak}
+        n_tot = len(a) + len(added)
         s = smatched / n_tot if n_tot != 0 else 1.0
         return self.options.syntax.emit_dict_diff(a, b, s, added, changed, removed), s
 
     def _obj_diff(self, a, b):
         if a is b:
             return self.options.syntax.emit_value_diff(a, b, 1.0), 1.0
-        if isinstance(a, dict) and isinstance(b, dict):
-            return self._dict_diff(a, b)
-        elif isinstance(a, tuple) and isinstance(b, tuple):
-            return self._list_diff(a, b)
-        elif isinstance(a, list) and isinstance(b, list):
-            return self._list_diff(a, b)
-        elif isinstance(a, set) and isinstance(b, set):
-            return self._set_diff(a, b)
-        elif a != b:
+        ta, tb = type(a), type(b)
+        if ta is tb and ta in _leaf_types:
+            s = 1.0 if a == b else 0.0
+            return self.options.syntax.emit_value_diff(a, b, s), s
+        fn = self._dispatch.get((ta, tb))
+        if fn is not None:
+            return fn(a, b)
+        if a != b:
             return self.options.syntax.emit_value_diff(a, b, 0.0), 0.0
         else:
             return self.options.syntax.emit_value_diff(a, b, 1.0), 1.0
@@ -305,7 +533,7 @@ class JsonDiffer:
 
         return s
 
-    def patch(self, a, d, fp=None):
+    def patch(self, a, d, fp=None, inplace=False):
         if self.options.load:
             a = self.options.loader(a)
             d = self.options.loader(d)
@@ -313,7 +541,10 @@ class JsonDiffer:
         if self.options.marshal or self.options.load:
             d = self.unmarshal(d)
 
-        b = self.options.syntax.patch(a, d)
+        if inplace:
+            b = self.options.syntax.patch(a, d, inplace=True)
+        else:
+            b = self.options.syntax.patch(a, d)
 
         if self.options.dump:
             return self.options.dumper(b, fp)
@@ -335,49 +566,92 @@ class JsonDiffer:
         else:
             return a
 
-    def _unescape(self, x):
-        if isinstance(x, str):
-            sym = self._symbol_map.get(x, None)
-            if sym is not None:
-                return sym
-            if x.startswith(self.options.escape_str):
-                return x[1:]
-        return x
+    def _walk(self, d, transform):
+        # iterative replacement for the recursive marshal/unmarshal
+        # comprehensions; tuples are built as lists and fixed up at the
+        # end, children before parents
+        root = [None]
+        stack = [(root, 0, d)]
+        fixups = []
+        while stack:
+            parent, key, value = stack.pop()
+            if isinstance(value, dict):
+                out = {}
+                parent[key] = out
+                for k, v in reversed(list(value.items())):
+                    stack.append((out, transform(k), v))
+            elif isinstance(value, (list, tuple)):
+                out = [None] * len(value)
+                parent[key] = out
+                if type(value) is not list:
+                    fixups.append((parent, key, out, type(value)))
+                for idx in range(len(value) - 1, -1, -1):
+                    stack.append((out, idx, value[idx]))
+            else:
+                parent[key] = transform(value)
+        for parent, key, out, ty in reversed(fixups):
+            parent[key] = ty(out)
+        return root[0]
 
     def unmarshal(self, d):
-        if isinstance(d, dict):
-            return {self._unescape(k): self.unmarshal(v) for k, v in d.items()}
-        elif isinstance(d, (list, tuple)):
-            return type(d)(self.unmarshal(x) for x in d)
-        else:
-            return self._unescape(d)
-
-    def _escape(self, o):
-        if type(o) is Symbol:
-            return self.options.escape_str + o.label
-        if isinstance(o, str) and o.startswith(self.options.escape_str):
-            return self.options.escape_str + o
-        return o
+        cache = self._unescape_cache
+        symbol_get = self._symbol_map.get
+        esc = self.options.escape_str
+        esc_len = len(esc)
+
+        def unescape(x):
+            if isinstance(x, str):
+                # the same few escaped keys recur across diffs, so keep
+                # a bounded per-instance cache of resolved strings
+                hit = cache.get(x, missing)
+                if hit is not missing:
+                    return hit
+                r = symbol_get(x)
+                if r is None:
+                    r = x[esc_len:] if x[:esc_len] == esc else x
+                if len(cache) < 1024:
+                    cache[x] = r
+                return r
+            return x
+
+        return self._walk(d, unescape)
 
     def marshal(self, d):
-        if isinstance(d, dict):
-            return {self._escape(k): self.marshal(v) for k, v in d.items()}
-        elif isinstance(d, (list, tuple)):
-            return type(d)(self.marshal(x) for x in d)
-        else:
-            return self._escape(d)
+        esc = self.options.escape_str
+        esc_len = len(esc)
+
+        def escape(o):
+            if type(o) is Symbol:
+                return esc + o.label
+            if isinstance(o, str) and o[:esc_len] == esc:
+                return esc + o
+            return o
+
+        return self._walk(d, escape)
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_differ(cls, frozen_kwargs):
+    return cls(**dict(frozen_kwargs))
+
+
+def _get_differ(cls, kwargs):
+    try:
+        return _cached_differ(cls, tuple(sorted(kwargs.items())))
+    except TypeError:
+        return cls(**kwargs)
 
 
 def diff(a, b, fp=None, cls=JsonDiffer, **kwargs):
-    return cls(**kwargs).diff(a, b, fp)
+    return _get_differ(cls, kwargs).diff(a, b, fp)
 
 
 def patch(a, d, fp=None, cls=JsonDiffer, **kwargs):
-    return cls(**kwargs).patch(a, d, fp)
+    return _get_differ(cls, kwargs).patch(a, d, fp)
 
 
 def similarity(a, b, cls=JsonDiffer, **kwargs):
-    return cls(**kwargs).similarity(a, b)
+    return _get_differ(cls, kwargs).similarity(a, b)
 
 
 __all__ = [